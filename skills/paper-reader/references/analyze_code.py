@@ -24,14 +24,40 @@ Examples:
     python analyze_code.py ./bert_code ./output --mode targeted --targets "BertAttention,BertModel"
 """
 
+import io
 import os
 import re
 import ast
 import json
+import array
+import pickle
+import hashlib
 import argparse
+import multiprocessing
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Tuple, Optional, Union
+from dataclasses import dataclass, asdict, replace
+
+try:
+    import orjson  # Optional C serializer, ~2-5x faster than stdlib json
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import numba
+    import numpy as np
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def dump_json_bytes(obj) -> bytes:
+    """Serialize to indented JSON bytes, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
 
 
 # =============================================================================
@@ -57,25 +83,41 @@ SKIP_PATTERNS = [
     r'__init__\.py$',  # Usually just imports
 ]
 
+# Skeleton rendering only ever shows this many methods per class
+MAX_METHODS_SHOWN = 10
+
 # Target token limits per chunk
 DEFAULT_MAX_TOKENS = 4000
 TOKENS_PER_CHAR = 0.25  # Rough estimate
 
+# Precompiled alternations so each path is tested with a single regex call
+_SKIP_RE = re.compile("|".join(f"(?:{p})" for p in SKIP_PATTERNS))
+
+# One alternation per priority level, tried best-first: a filename that
+# matches several levels (e.g. train_model.py hits both train.* and
+# model.py) must keep the highest priority, which a single combined
+# union cannot guarantee (it returns the leftmost match)
+_PRIORITY_RES = [
+    (priority, re.compile("|".join(f"(?:{p})" for p in patterns)))
+    for priority, patterns in sorted(FILE_PRIORITY.items())
+]
+
 
 # =============================================================================
 # Data Classes
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class ClassInfo:
     name: str
     bases: List[str]
-    methods: List[str]
+    methods: List[str]  # Truncated to MAX_METHODS_SHOWN at parse time
+    method_count: int
     docstring: Optional[str]
     line_start: int
     line_end: int
     
-@dataclass
+@dataclass(slots=True)
 class FunctionInfo:
     name: str
     args: str
@@ -85,7 +127,7 @@ class FunctionInfo:
     line_end: int
     decorators: List[str]
 
-@dataclass
+@dataclass(slots=True)
 class FileInfo:
     path: str
     priority: int
@@ -93,213 +135,310 @@ class FileInfo:
     functions: List[FunctionInfo]
     imports: List[str]
     total_lines: int
+    source: Optional[str] = None  # Full source, kept only in full mode
 
 
 # =============================================================================
 # AST Parser
 # =============================================================================
 
+def should_skip(path: str) -> bool:
+    """Check if file/directory should be skipped."""
+    return _SKIP_RE.search(path) is not None
+
+
+def get_priority(filename: str) -> int:
+    """Determine file priority (lower = more important)."""
+    for priority, regex in _PRIORITY_RES:
+        if regex.search(filename):
+            return priority
+    return 99  # Default: lowest priority
+
+
+def parse_file_worker(filepath: str, source_dir: str, keep_source: bool = False) -> Optional[FileInfo]:
+    """Parse a single Python file (module-level so it can run in a worker process)."""
+    try:
+        # Single raw read + one decode pass; skips the TextIOWrapper layer
+        # and its incremental decoder
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        source = raw.decode('utf-8', errors='ignore')
+
+        # type_comments=False is the default, but pin it: signature
+        # extraction never needs the extra type-comment grammar passes
+        tree = ast.parse(source, filename=filepath, type_comments=False)
+        lines = source.split('\n')
+
+        classes = []
+        functions = []
+        imports = []
+
+        # Single pass over top-level nodes: imports only matter at module
+        # level, so there is no need to ast.walk the whole tree for them
+        for node in ast.iter_child_nodes(tree):
+            if isinstance(node, ast.ClassDef):
+                classes.append(_parse_class(node))
+            elif isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
+                functions.append(_parse_function(node))
+            elif len(imports) >= 10:  # Limit imports
+                continue
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    imports.append(f"import {alias.name}")
+            elif isinstance(node, ast.ImportFrom):
+                module = node.module or ''
+                names = ', '.join(alias.name for alias in node.names[:5])
+                if len(node.names) > 5:
+                    names += ', ...'
+                imports.append(f"from {module} import {names}")
+
+        rel_path = str(Path(filepath).relative_to(source_dir))
+        priority = get_priority(Path(filepath).name)
+
+        return FileInfo(
+            path=rel_path,
+            priority=priority,
+            classes=classes,
+            functions=functions,
+            imports=imports[:10],  # An ast.Import node may carry several aliases
+            total_lines=len(lines),
+            source=source if keep_source else None
+        )
+
+    except SyntaxError as e:
+        print(f"  [WARN] Syntax error in {filepath}: {e}")
+        return None
+    except Exception as e:
+        print(f"  [WARN] Error parsing {filepath}: {e}")
+        return None
+
+
+def _parse_task(task: tuple) -> tuple:
+    """Unpack one (filepath, source_dir, keep_source, cache_key) pool task."""
+    filepath, source_dir, keep_source, key = task
+    return key, parse_file_worker(filepath, source_dir, keep_source)
+
+
+def _parse_class(node: ast.ClassDef) -> ClassInfo:
+    """Extract class information."""
+    bases: List[str] = []
+    for base in node.bases:
+        if isinstance(base, ast.Name):
+            bases.append(base.id)
+        elif isinstance(base, ast.Attribute):
+            bases.append(f"{_get_attr_name(base)}")
+
+    # Only format/store the signatures that will ever be rendered
+    methods: List[str] = []
+    method_count = 0
+    for item in node.body:
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            method_count += 1
+            if method_count <= MAX_METHODS_SHOWN:
+                args = _format_args(item.args)
+                methods.append(f"{item.name}({args})")
+
+    docstring = ast.get_docstring(node)
+    if docstring and len(docstring) > 200:
+        docstring = docstring[:200] + "..."
+
+    return ClassInfo(
+        name=node.name,
+        bases=bases,
+        methods=methods,
+        method_count=method_count,
+        docstring=docstring,
+        line_start=node.lineno,
+        line_end=node.end_lineno or node.lineno
+    )
+
+
+def _parse_function(node: Union[ast.FunctionDef, ast.AsyncFunctionDef]) -> FunctionInfo:
+    """Extract function information."""
+    args = _format_args(node.args)
+
+    returns = None
+    if node.returns:
+        returns = _get_annotation(node.returns)
+
+    decorators: List[str] = []
+    for dec in node.decorator_list:
+        if isinstance(dec, ast.Name):
+            decorators.append(f"@{dec.id}")
+        elif isinstance(dec, ast.Attribute):
+            decorators.append(f"@{_get_attr_name(dec)}")
+
+    docstring = ast.get_docstring(node)
+    if docstring and len(docstring) > 150:
+        docstring = docstring[:150] + "..."
+
+    return FunctionInfo(
+        name=node.name,
+        args=args,
+        returns=returns,
+        docstring=docstring,
+        line_start=node.lineno,
+        line_end=node.end_lineno or node.lineno,
+        decorators=decorators
+    )
+
+
+def _format_args(args: ast.arguments) -> str:
+    """Format function arguments."""
+    parts: List[str] = []
+
+    # Regular args
+    for arg in args.args[:6]:  # Limit to first 6 args
+        if arg.annotation:
+            parts.append(f"{arg.arg}: {_get_annotation(arg.annotation)}")
+        else:
+            parts.append(arg.arg)
+
+    if len(args.args) > 6:
+        parts.append("...")
+
+    # *args and **kwargs
+    if args.vararg:
+        parts.append(f"*{args.vararg.arg}")
+    if args.kwarg:
+        parts.append(f"**{args.kwarg.arg}")
+
+    return ", ".join(parts)
+
+
+# Exact-type dispatch: AST node classes are never subclassed here, so a
+# single dict lookup on type(node) replaces the isinstance chain
+_ANNOTATION_DISPATCH = {
+    ast.Name: lambda n: n.id,
+    ast.Constant: lambda n: str(n.value),
+    ast.Subscript: lambda n: f"{_get_annotation(n.value)}[...]",
+    ast.Attribute: lambda n: _get_attr_name(n),
+}
+
+
+def _get_annotation(node: ast.expr) -> str:
+    """Get type annotation as string."""
+    fn = _ANNOTATION_DISPATCH.get(type(node))
+    return fn(node) if fn else "Any"
+
+
+def _get_attr_name(node: ast.Attribute) -> str:
+    """Get full attribute name (e.g., nn.Module)."""
+    parts: List[str] = []
+    current: ast.expr = node
+    while isinstance(current, ast.Attribute):
+        parts.append(current.attr)
+        current = current.value
+    if isinstance(current, ast.Name):
+        parts.append(current.id)
+    return ".".join(reversed(parts))
+
+
+# Parse caches live under the user's cache dir (same location chunk_paper
+# uses), one file per analyzed tree. Never inside the scanned directory:
+# these are third-party downloads, and unpickling a file planted there
+# would execute attacker-controlled code
+_CACHE_DIR = Path.home() / '.cache' / 'paper-reader'
+
+
 class CodeAnalyzer:
     """Analyzes Python source files using AST."""
-    
+
     def __init__(self, source_dir: str):
         self.source_dir = Path(source_dir)
         self.files: List[FileInfo] = []
-        
-    def should_skip(self, path: str) -> bool:
-        """Check if file/directory should be skipped."""
-        for pattern in SKIP_PATTERNS:
-            if re.search(pattern, path):
-                return True
-        return False
-    
-    def get_priority(self, filename: str) -> int:
-        """Determine file priority (lower = more important)."""
-        for priority, patterns in FILE_PRIORITY.items():
-            for pattern in patterns:
-                if re.search(pattern, filename):
-                    return priority
-        return 99  # Default: lowest priority
-    
-    def parse_file(self, filepath: Path) -> Optional[FileInfo]:
-        """Parse a single Python file."""
+        dir_key = hashlib.blake2b(str(self.source_dir.resolve()).encode()).hexdigest()[:16]
+        self._cache_path = _CACHE_DIR / f"{dir_key}.analyze.pickle"
+        self._cache: Dict[tuple, FileInfo] = self._load_cache()
+
+    # Bump whenever the pickled dataclass layout changes, so stale caches
+    # are discarded instead of yielding objects with missing fields
+    # (v3: cached priorities from the old combined-union get_priority)
+    CACHE_VERSION = 3
+
+    def _load_cache(self) -> Dict[tuple, FileInfo]:
+        """Load parse results from a previous run, keyed on (path, mtime, size)."""
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                source = f.read()
-            
-            tree = ast.parse(source)
-            lines = source.split('\n')
-            
-            classes = []
-            functions = []
-            imports = []
-            
-            for node in ast.walk(tree):
-                # Extract imports
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        imports.append(f"import {alias.name}")
-                elif isinstance(node, ast.ImportFrom):
-                    module = node.module or ''
-                    names = ', '.join(alias.name for alias in node.names[:5])
-                    if len(node.names) > 5:
-                        names += ', ...'
-                    imports.append(f"from {module} import {names}")
-            
-            # Top-level classes and functions only
-            for node in ast.iter_child_nodes(tree):
-                if isinstance(node, ast.ClassDef):
-                    classes.append(self._parse_class(node))
-                elif isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-                    functions.append(self._parse_function(node))
-            
-            rel_path = str(filepath.relative_to(self.source_dir))
-            priority = self.get_priority(filepath.name)
-            
-            return FileInfo(
-                path=rel_path,
-                priority=priority,
-                classes=classes,
-                functions=functions,
-                imports=imports[:10],  # Limit imports
-                total_lines=len(lines)
-            )
-            
-        except SyntaxError as e:
-            print(f"  [WARN] Syntax error in {filepath}: {e}")
-            return None
-        except Exception as e:
-            print(f"  [WARN] Error parsing {filepath}: {e}")
-            return None
-    
-    def _parse_class(self, node: ast.ClassDef) -> ClassInfo:
-        """Extract class information."""
-        bases = []
-        for base in node.bases:
-            if isinstance(base, ast.Name):
-                bases.append(base.id)
-            elif isinstance(base, ast.Attribute):
-                bases.append(f"{self._get_attr_name(base)}")
-        
-        methods = []
-        for item in node.body:
-            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                # Include method signature
-                args = self._format_args(item.args)
-                methods.append(f"{item.name}({args})")
-        
-        docstring = ast.get_docstring(node)
-        if docstring and len(docstring) > 200:
-            docstring = docstring[:200] + "..."
-        
-        return ClassInfo(
-            name=node.name,
-            bases=bases,
-            methods=methods,
-            docstring=docstring,
-            line_start=node.lineno,
-            line_end=node.end_lineno or node.lineno
-        )
-    
-    def _parse_function(self, node) -> FunctionInfo:
-        """Extract function information."""
-        args = self._format_args(node.args)
-        
-        returns = None
-        if node.returns:
-            returns = self._get_annotation(node.returns)
-        
-        decorators = []
-        for dec in node.decorator_list:
-            if isinstance(dec, ast.Name):
-                decorators.append(f"@{dec.id}")
-            elif isinstance(dec, ast.Attribute):
-                decorators.append(f"@{self._get_attr_name(dec)}")
-        
-        docstring = ast.get_docstring(node)
-        if docstring and len(docstring) > 150:
-            docstring = docstring[:150] + "..."
-        
-        return FunctionInfo(
-            name=node.name,
-            args=args,
-            returns=returns,
-            docstring=docstring,
-            line_start=node.lineno,
-            line_end=node.end_lineno or node.lineno,
-            decorators=decorators
-        )
-    
-    def _format_args(self, args: ast.arguments) -> str:
-        """Format function arguments."""
-        parts = []
-        
-        # Regular args
-        for arg in args.args[:6]:  # Limit to first 6 args
-            if arg.annotation:
-                parts.append(f"{arg.arg}: {self._get_annotation(arg.annotation)}")
-            else:
-                parts.append(arg.arg)
-        
-        if len(args.args) > 6:
-            parts.append("...")
-        
-        # *args and **kwargs
-        if args.vararg:
-            parts.append(f"*{args.vararg.arg}")
-        if args.kwarg:
-            parts.append(f"**{args.kwarg.arg}")
-        
-        return ", ".join(parts)
-    
-    def _get_annotation(self, node) -> str:
-        """Get type annotation as string."""
-        if isinstance(node, ast.Name):
-            return node.id
-        elif isinstance(node, ast.Constant):
-            return str(node.value)
-        elif isinstance(node, ast.Subscript):
-            return f"{self._get_annotation(node.value)}[...]"
-        elif isinstance(node, ast.Attribute):
-            return self._get_attr_name(node)
-        return "Any"
-    
-    def _get_attr_name(self, node: ast.Attribute) -> str:
-        """Get full attribute name (e.g., nn.Module)."""
-        parts = []
-        current = node
-        while isinstance(current, ast.Attribute):
-            parts.append(current.attr)
-            current = current.value
-        if isinstance(current, ast.Name):
-            parts.append(current.id)
-        return ".".join(reversed(parts))
-    
-    def scan_directory(self) -> List[FileInfo]:
-        """Scan all Python files in directory."""
+            with open(self._cache_path, 'rb') as f:
+                version, cache = pickle.load(f)
+            return cache if version == self.CACHE_VERSION else {}
+        except Exception:
+            return {}
+
+    def _save_cache(self, keys) -> None:
+        """Persist parse results, pruning entries for files that are gone."""
+        try:
+            _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with open(self._cache_path, 'wb') as f:
+                pickle.dump((self.CACHE_VERSION,
+                             {k: self._cache[k] for k in keys if k in self._cache}),
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+
+    def _iter_python_files(self, dirpath: Path):
+        """Recursively yield (path, size) pairs using os.scandir (faster than os.walk)."""
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not should_skip(entry.name):
+                        yield from self._iter_python_files(Path(entry.path))
+                elif entry.name.endswith('.py'):
+                    filepath = Path(entry.path)
+                    rel_path = str(filepath.relative_to(self.source_dir))
+                    if not should_skip(rel_path):
+                        stat = entry.stat()
+                        yield filepath, stat.st_size, stat.st_mtime_ns
+
+    def scan_directory(self, keep_source: bool = False) -> List[FileInfo]:
+        """Scan all Python files in directory, parsing them in parallel.
+
+        With keep_source=True the raw source is kept on each FileInfo so
+        generate_chunks does not have to re-read every file from disk.
+        """
         print(f"Scanning: {self.source_dir}")
-        
-        for root, dirs, files in os.walk(self.source_dir):
-            # Filter directories
-            dirs[:] = [d for d in dirs if not self.should_skip(d)]
-            
-            for filename in files:
-                if not filename.endswith('.py'):
-                    continue
-                    
-                filepath = Path(root) / filename
-                rel_path = str(filepath.relative_to(self.source_dir))
-                
-                if self.should_skip(rel_path):
-                    continue
-                
-                file_info = self.parse_file(filepath)
-                if file_info:
-                    self.files.append(file_info)
-                    print(f"  [P{file_info.priority}] {rel_path} ({len(file_info.classes)} classes, {len(file_info.functions)} functions)")
-        
-        # Sort by priority
-        self.files.sort(key=lambda x: (x.priority, x.path))
+
+        # Dispatch the largest files first so one late big file cannot
+        # stall the pool while the other workers sit idle
+        entries = sorted(self._iter_python_files(self.source_dir), key=lambda e: -e[1])
+
+        # Serve unchanged files from the cache; only misses hit the pool
+        seen_keys = []
+        to_parse = []
+        for filepath, size, mtime_ns in entries:
+            key = (str(filepath), mtime_ns, size)
+            seen_keys.append(key)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.files.append(cached)
+                print(f"  [P{cached.priority}] {cached.path} (cached)")
+            else:
+                to_parse.append((str(filepath), key))
+
+        if to_parse:
+            tasks = [(path, str(self.source_dir), keep_source, key)
+                     for path, key in to_parse]
+            workers = os.cpu_count() or 1
+            # Batch tasks to amortize pickling, but keep batches small
+            # enough that one worker cannot hoard the size-sorted head
+            # of the queue
+            chunksize = min(32, max(1, len(tasks) // (workers * 4)))
+            with multiprocessing.Pool(workers) as pool:
+                for key, file_info in pool.imap_unordered(_parse_task, tasks, chunksize=chunksize):
+                    if file_info:
+                        self.files.append(file_info)
+                        # Cache without the raw source to keep the file small
+                        self._cache[key] = replace(file_info, source=None)
+                        print(f"  [P{file_info.priority}] {file_info.path} ({len(file_info.classes)} classes, {len(file_info.functions)} functions)")
+
+        self._save_cache(seen_keys)
+
+        # Sort by priority via an index sort over compact parallel arrays,
+        # so the comparison never chases FileInfo pointers
+        prios = array.array('B', (f.priority for f in self.files))
+        paths = [f.path for f in self.files]
+        order = sorted(range(len(self.files)), key=lambda i: (prios[i], paths[i]))
+        self.files = [self.files[i] for i in order]
         return self.files
 
 
@@ -307,6 +446,49 @@ class CodeAnalyzer:
 # Output Generators
 # =============================================================================
 
+if HAS_NUMBA:
+    @numba.njit(cache=True)
+    def _pack_chunks_jit(tokens, max_tokens):
+        out = np.empty(tokens.shape[0], dtype=np.int64)
+        current = 0
+        count = 0
+        chunk_index = 0
+        for i in range(tokens.shape[0]):
+            if count > 0 and current + tokens[i] > max_tokens:
+                chunk_index += 1
+                current = 0
+                count = 0
+            out[i] = chunk_index
+            current += tokens[i]
+            count += 1
+        return out
+
+
+def _pack_chunks(tokens: List[int], max_tokens: int) -> List[int]:
+    """Assign a chunk index to each file given its token estimate.
+
+    Files are assumed pre-sorted; a new chunk starts whenever adding the
+    next file would exceed max_tokens. The Numba path is only worth its
+    dispatch overhead on large repos.
+    """
+    if HAS_NUMBA and len(tokens) > 500:
+        return _pack_chunks_jit(np.asarray(tokens, dtype=np.int64), max_tokens).tolist()
+
+    assignment = []
+    current = 0
+    count = 0
+    chunk_index = 0
+    for t in tokens:
+        if count > 0 and current + t > max_tokens:
+            chunk_index += 1
+            current = 0
+            count = 0
+        assignment.append(chunk_index)
+        current += t
+        count += 1
+    return assignment
+
+
 class OutputGenerator:
     """Generates various output formats."""
     
@@ -322,142 +504,158 @@ class OutputGenerator:
     
     def generate_skeleton(self) -> str:
         """Generate skeleton view (structure only, no implementations)."""
-        lines = []
-        lines.append("# Code Structure Skeleton\n")
-        lines.append("## File Tree\n```")
-        
+        # Write into a single C-backed buffer instead of accumulating a
+        # list of short strings and joining at the end
+        buf = io.StringIO()
+        w = buf.write
+        w("# Code Structure Skeleton\n\n")
+        w("## File Tree\n```\n")
+
         # File tree
         for f in self.files:
             priority_marker = f"[P{f.priority}]" if f.priority < 99 else ""
-            lines.append(f"{priority_marker} {f.path} ({f.total_lines} lines)")
-        lines.append("```\n")
-        
+            w(f"{priority_marker} {f.path} ({f.total_lines} lines)\n")
+        w("```\n\n")
+
         # Class/function signatures by priority
-        lines.append("## Signatures by Priority\n")
-        
+        w("## Signatures by Priority\n\n")
+
         current_priority = -1
         for f in self.files:
             if f.priority != current_priority:
                 current_priority = f.priority
-                lines.append(f"\n### Priority {current_priority}\n")
-            
+                w(f"\n### Priority {current_priority}\n\n")
+
             if f.classes or f.functions:
-                lines.append(f"\n#### `{f.path}`\n```python")
-                
+                w(f"\n#### `{f.path}`\n```python\n")
+
                 for cls in f.classes:
                     bases = f"({', '.join(cls.bases)})" if cls.bases else ""
-                    lines.append(f"class {cls.name}{bases}:")
-                    for method in cls.methods[:10]:  # Limit methods shown
-                        lines.append(f"    def {method}: ...")
-                    if len(cls.methods) > 10:
-                        lines.append(f"    # ... {len(cls.methods) - 10} more methods")
-                    lines.append("")
-                
+                    w(f"class {cls.name}{bases}:\n")
+                    for method in cls.methods:
+                        w(f"    def {method}: ...\n")
+                    if cls.method_count > MAX_METHODS_SHOWN:
+                        w(f"    # ... {cls.method_count - MAX_METHODS_SHOWN} more methods\n")
+                    w("\n")
+
                 for func in f.functions:
-                    decs = "\n".join(func.decorators)
-                    if decs:
-                        lines.append(decs)
+                    for dec in func.decorators:
+                        w(dec)
+                        w("\n")
                     ret = f" -> {func.returns}" if func.returns else ""
-                    lines.append(f"def {func.name}({func.args}){ret}: ...")
-                
-                lines.append("```")
-        
-        skeleton = "\n".join(lines)
+                    w(f"def {func.name}({func.args}){ret}: ...\n")
+
+                w("```\n")
+
+        skeleton = buf.getvalue()
         
-        # Save skeleton
+        # Save skeleton: one encode + one write, no TextIOWrapper layer
         skeleton_path = self.output_dir / "skeleton.md"
-        with open(skeleton_path, 'w', encoding='utf-8') as f:
-            f.write(skeleton)
+        skeleton_path.write_bytes(skeleton.encode('utf-8'))
         
         print(f"\nSkeleton saved: {skeleton_path} (~{self.estimate_tokens(skeleton)} tokens)")
         return skeleton
     
     def generate_chunks(self, source_dir: Path) -> List[Dict]:
-        """Generate prioritized chunks with full source code."""
+        """Generate prioritized chunks with full source code.
+
+        Each chunk file is held open and written file-by-file, so memory
+        stays O(one file) regardless of max_tokens.
+        """
         chunks = []
-        current_chunk = []
+        current_fh = None
+        current_name = ""
+        current_files: List[str] = []
         current_tokens = 0
         current_priority = 0
         chunk_index = 0
-        
-        for file_info in self.files:
-            # Read full source
-            filepath = source_dir / file_info.path
-            try:
-                with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                    source = f.read()
-            except:
-                continue
-            
-            file_content = f"# File: {file_info.path}\n# Priority: P{file_info.priority}\n# Lines: {file_info.total_lines}\n\n{source}"
-            file_tokens = self.estimate_tokens(file_content)
-            
-            # Check if we need a new chunk
-            if current_tokens + file_tokens > self.max_tokens and current_chunk:
-                # Save current chunk
-                chunk_text = "\n\n" + "="*60 + "\n\n".join(current_chunk)
-                chunk_name = f"chunk_{chunk_index:02d}_P{current_priority}.md"
-                chunk_path = self.output_dir / chunk_name
-                
-                with open(chunk_path, 'w', encoding='utf-8') as f:
-                    f.write(chunk_text)
-                
-                chunks.append({
-                    "index": chunk_index,
-                    "priority": current_priority,
-                    "filename": chunk_name,
-                    "files": [c.split('\n')[0].replace('# File: ', '') for c in current_chunk],
-                    "tokens": current_tokens
-                })
-                
-                print(f"  Chunk {chunk_index}: P{current_priority}, {len(current_chunk)} files, ~{current_tokens} tokens")
-                
-                current_chunk = []
-                current_tokens = 0
-                chunk_index += 1
-            
-            current_chunk.append(file_content)
-            current_tokens += file_tokens
-            current_priority = file_info.priority
-        
-        # Save last chunk
-        if current_chunk:
-            chunk_text = "\n\n" + "="*60 + "\n\n".join(current_chunk)
-            chunk_name = f"chunk_{chunk_index:02d}_P{current_priority}.md"
-            chunk_path = self.output_dir / chunk_name
-            
-            with open(chunk_path, 'w', encoding='utf-8') as f:
-                f.write(chunk_text)
-            
+        current_target = -1  # assignment value of the open chunk
+
+        def close_chunk():
+            nonlocal current_fh, current_files, current_tokens, chunk_index
+            current_fh.close()
             chunks.append({
                 "index": chunk_index,
                 "priority": current_priority,
-                "filename": chunk_name,
-                "files": [c.split('\n')[0].replace('# File: ', '') for c in current_chunk],
+                "filename": current_name,
+                "files": current_files,
                 "tokens": current_tokens
             })
-            
-            print(f"  Chunk {chunk_index}: P{current_priority}, {len(current_chunk)} files, ~{current_tokens} tokens")
-        
+            print(f"  Chunk {chunk_index}: P{current_priority}, {len(current_files)} files, ~{current_tokens} tokens")
+            current_fh = None
+            current_files = []
+            current_tokens = 0
+            chunk_index += 1
+
+        # Precompute token estimates (from the cached source, or the file
+        # size when not cached) and pack first-fit-decreasing within each
+        # priority band for tighter chunks
+        work = []
+        for file_info in self.files:
+            if file_info.source is not None:
+                file_tokens = self.estimate_tokens(file_info.source)
+            else:
+                try:
+                    file_tokens = int((source_dir / file_info.path).stat().st_size * TOKENS_PER_CHAR)
+                except OSError:
+                    continue
+            work.append((file_info, file_tokens))
+        work.sort(key=lambda e: (e[0].priority, -e[1]))
+        assignment = _pack_chunks([t for _, t in work], self.max_tokens)
+
+        for (file_info, file_tokens), target_chunk in zip(work, assignment):
+            # Rotate once the packing assignment moves to the next chunk.
+            # Compare against the open chunk's own assignment value, not
+            # chunk_index: skipped (unreadable) files may leave gaps in
+            # the assignment sequence, and the output-file counter must
+            # not drift from the precomputed plan
+            if current_fh is not None and target_chunk != current_target:
+                close_chunk()
+
+            # Only read the source once the file is actually being written
+            if file_info.source is not None:
+                source = file_info.source
+            else:
+                filepath = source_dir / file_info.path
+                try:
+                    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                        source = f.read()
+                except:
+                    continue
+
+            file_content = f"# File: {file_info.path}\n# Priority: P{file_info.priority}\n# Lines: {file_info.total_lines}\n\n{source}"
+
+            if current_fh is None:
+                # Chunk is labeled with its first (highest-priority) file
+                current_target = target_chunk
+                current_priority = file_info.priority
+                current_name = f"chunk_{chunk_index:02d}_P{current_priority}.md"
+                current_fh = open(self.output_dir / current_name, 'wb')
+                current_fh.write(("\n\n" + "="*60).encode('utf-8'))
+            else:
+                current_fh.write(b"\n\n")
+
+            current_fh.write(file_content.encode('utf-8'))
+            current_files.append(file_info.path)
+            current_tokens += file_tokens
+
+        if current_fh is not None:
+            close_chunk()
+
         return chunks
     
     def generate_manifest(self, chunks: List[Dict]) -> None:
         """Generate manifest file with chunk index."""
+        priority_counts = Counter(f.priority for f in self.files)
         manifest = {
             "total_files": len(self.files),
             "total_chunks": len(chunks),
-            "priority_distribution": {},
+            "priority_distribution": {f"P{p}": n for p, n in sorted(priority_counts.items())},
             "chunks": chunks
         }
         
-        # Count files by priority
-        for f in self.files:
-            p = f"P{f.priority}"
-            manifest["priority_distribution"][p] = manifest["priority_distribution"].get(p, 0) + 1
-        
         manifest_path = self.output_dir / "manifest.json"
-        with open(manifest_path, 'w', encoding='utf-8') as f:
-            json.dump(manifest, f, indent=2)
+        manifest_path.write_bytes(dump_json_bytes(manifest))
         
         print(f"\nManifest saved: {manifest_path}")
 
@@ -482,6 +680,8 @@ def main():
                         help="Comma-separated class/function names for targeted mode")
     parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS,
                         help=f"Max tokens per chunk (default: {DEFAULT_MAX_TOKENS})")
+    parser.add_argument("--also-skeleton", action="store_true",
+                        help="Write skeleton.md even when mode is not 'skeleton'")
     
     args = parser.parse_args()
     
@@ -496,7 +696,7 @@ def main():
     
     # Analyze
     analyzer = CodeAnalyzer(str(source_dir))
-    files = analyzer.scan_directory()
+    files = analyzer.scan_directory(keep_source=(args.mode == "full"))
     
     if not files:
         print("No Python files found!")
@@ -507,10 +707,14 @@ def main():
     # Generate output
     generator = OutputGenerator(files, args.output_dir, args.max_tokens)
     
-    print("\n" + "-"*40)
-    print("Generating skeleton...")
-    generator.generate_skeleton()
-    
+    # Only pay for the skeleton pass when its output is actually wanted:
+    # full mode skips it unless --also-skeleton is given, every other mode
+    # (skeleton, targeted) has skeleton.md as its output artifact
+    if args.mode != "full" or args.also_skeleton:
+        print("\n" + "-"*40)
+        print("Generating skeleton...")
+        generator.generate_skeleton()
+
     if args.mode == "full":
         print("\n" + "-"*40)
         print("Generating full source chunks...")
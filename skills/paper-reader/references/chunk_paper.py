@@ -1,353 +1,599 @@
-#!/usr/bin/env python3
-"""
-Paper PDF Chunker
-
-Extracts text from PDF and splits it into manageable chunks by sections.
-Useful for processing large papers that exceed context window limits.
-
-Usage:
-    python chunk_paper.py <pdf_path> [output_dir] [--max-tokens N]
-
-Examples:
-    python chunk_paper.py paper.pdf
-    python chunk_paper.py paper.pdf ./chunks/
-    python chunk_paper.py paper.pdf ./chunks/ --max-tokens 3000
-
-Requirements:
-    pip install PyMuPDF  # or: pip install pymupdf
-"""
-
-import argparse
-import json
-import os
-import re
-import sys
-from pathlib import Path
-from typing import List, Dict, Tuple, Optional
-
-try:
-    import fitz  # PyMuPDF
-    HAS_PYMUPDF = True
-except ImportError:
-    HAS_PYMUPDF = False
-
-
-# Common section headers in research papers
-SECTION_PATTERNS = [
-    r'^(?:#{1,3}\s*)?(\d+\.?\s+)?(Abstract|Introduction|Related\s+Work|Background)',
-    r'^(?:#{1,3}\s*)?(\d+\.?\s+)?(Method(?:ology)?|Approach|(?:Proposed\s+)?(?:Method|Framework|Model))',
-    r'^(?:#{1,3}\s*)?(\d+\.?\s+)?(Experiment(?:s|al)?(?:\s+(?:Setup|Results))?|Results|Evaluation)',
-    r'^(?:#{1,3}\s*)?(\d+\.?\s+)?(Discussion|Analysis|Ablation(?:\s+Stud(?:y|ies))?)',
-    r'^(?:#{1,3}\s*)?(\d+\.?\s+)?(Conclusion(?:s)?|Summary|Future\s+Work)',
-    r'^(?:#{1,3}\s*)?(\d+\.?\s+)?(Appendix|Supplementary|References|Acknowledg(?:e)?ments?)',
-]
-
-# Priority mapping for sections
-SECTION_PRIORITY = {
-    'abstract': 0,
-    'conclusion': 0,
-    'introduction': 2,
-    'method': 1,
-    'methodology': 1,
-    'approach': 1,
-    'experiment': 1,
-    'experiments': 1,
-    'results': 1,
-    'evaluation': 1,
-    'related work': 2,
-    'background': 2,
-    'discussion': 2,
-    'analysis': 2,
-    'ablation': 2,
-    'appendix': 3,
-    'supplementary': 3,
-    'references': 4,
-    'acknowledgements': 4,
-}
-
-
-def estimate_tokens(text: str) -> int:
-    """Rough token estimation (1 token ≈ 4 chars for English)."""
-    return len(text) // 4
-
-
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from PDF using PyMuPDF."""
-    if not HAS_PYMUPDF:
-        raise ImportError(
-            "PyMuPDF is required for PDF processing.\n"
-            "Install with: pip install PyMuPDF"
-        )
-    
-    doc = fitz.open(pdf_path)
-    text_parts = []
-    
-    for page_num, page in enumerate(doc):
-        text = page.get_text()
-        text_parts.append(f"[PAGE {page_num + 1}]\n{text}")
-    
-    doc.close()
-    return "\n\n".join(text_parts)
-
-
-def identify_sections(text: str) -> List[Tuple[int, str, str]]:
-    """
-    Identify section boundaries in the text.
-    
-    Returns:
-        List of (start_pos, section_name, normalized_name)
-    """
-    sections = []
-    
-    for line_start in range(len(text)):
-        if line_start > 0 and text[line_start - 1] != '\n':
-            continue
-        
-        # Find end of line
-        line_end = text.find('\n', line_start)
-        if line_end == -1:
-            line_end = len(text)
-        
-        line = text[line_start:line_end].strip()
-        
-        # Skip empty or very long lines (not headers)
-        if not line or len(line) > 100:
-            continue
-        
-        # Check against section patterns
-        for pattern in SECTION_PATTERNS:
-            match = re.match(pattern, line, re.IGNORECASE)
-            if match:
-                # Extract section name
-                section_name = line
-                # Normalize for priority lookup
-                normalized = re.sub(r'^\d+\.?\s*', '', line.lower())
-                normalized = re.sub(r'[^\w\s]', '', normalized).strip()
-                
-                sections.append((line_start, section_name, normalized))
-                break
-    
-    return sections
-
-
-def split_into_chunks(
-    text: str,
-    sections: List[Tuple[int, str, str]],
-    max_tokens: int = 3500
-) -> List[Dict]:
-    """
-    Split text into chunks based on sections and token limits.
-    
-    Returns:
-        List of chunk dictionaries with metadata
-    """
-    chunks = []
-    
-    if not sections:
-        # No sections found, split by token count
-        return split_by_tokens(text, max_tokens)
-    
-    # Add end position for each section
-    section_ranges = []
-    for i, (start, name, normalized) in enumerate(sections):
-        end = sections[i + 1][0] if i + 1 < len(sections) else len(text)
-        priority = SECTION_PRIORITY.get(normalized.split()[0] if normalized else '', 2)
-        section_ranges.append({
-            'start': start,
-            'end': end,
-            'name': name,
-            'normalized': normalized,
-            'priority': priority
-        })
-    
-    # Group sections into chunks respecting token limits
-    current_chunk = {
-        'sections': [],
-        'text': '',
-        'priority': 999,
-        'tokens': 0
-    }
-    
-    for section in section_ranges:
-        section_text = text[section['start']:section['end']]
-        section_tokens = estimate_tokens(section_text)
-        
-        # If single section exceeds limit, split it
-        if section_tokens > max_tokens:
-            # Save current chunk if not empty
-            if current_chunk['text']:
-                chunks.append(current_chunk)
-                current_chunk = {'sections': [], 'text': '', 'priority': 999, 'tokens': 0}
-            
-            # Split large section into sub-chunks
-            sub_chunks = split_by_tokens(section_text, max_tokens, section['name'])
-            for sc in sub_chunks:
-                sc['priority'] = section['priority']
-                sc['sections'] = [section['name']]
-            chunks.extend(sub_chunks)
-            continue
-        
-        # Check if adding this section exceeds limit
-        if current_chunk['tokens'] + section_tokens > max_tokens and current_chunk['text']:
-            chunks.append(current_chunk)
-            current_chunk = {'sections': [], 'text': '', 'priority': 999, 'tokens': 0}
-        
-        # Add section to current chunk
-        current_chunk['sections'].append(section['name'])
-        current_chunk['text'] += section_text + '\n\n'
-        current_chunk['priority'] = min(current_chunk['priority'], section['priority'])
-        current_chunk['tokens'] += section_tokens
-    
-    # Don't forget the last chunk
-    if current_chunk['text']:
-        chunks.append(current_chunk)
-    
-    # Sort by priority
-    chunks.sort(key=lambda x: x['priority'])
-    
-    # Add chunk indices
-    for i, chunk in enumerate(chunks):
-        chunk['index'] = i
-        chunk['total'] = len(chunks)
-    
-    return chunks
-
-
-def split_by_tokens(
-    text: str,
-    max_tokens: int,
-    section_name: str = "content"
-) -> List[Dict]:
-    """Split text into chunks by token count, respecting paragraph boundaries."""
-    chunks = []
-    paragraphs = text.split('\n\n')
-    
-    current_text = ''
-    current_tokens = 0
-    
-    for para in paragraphs:
-        para_tokens = estimate_tokens(para)
-        
-        if current_tokens + para_tokens > max_tokens and current_text:
-            chunks.append({
-                'sections': [section_name],
-                'text': current_text.strip(),
-                'tokens': current_tokens
-            })
-            current_text = ''
-            current_tokens = 0
-        
-        current_text += para + '\n\n'
-        current_tokens += para_tokens
-    
-    if current_text.strip():
-        chunks.append({
-            'sections': [section_name],
-            'text': current_text.strip(),
-            'tokens': current_tokens
-        })
-    
-    return chunks
-
-
-def save_chunks(
-    chunks: List[Dict],
-    output_dir: str,
-    base_name: str
-) -> List[str]:
-    """Save chunks to individual files."""
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    
-    saved_files = []
-    
-    # Save manifest
-    manifest = {
-        'source': base_name,
-        'total_chunks': len(chunks),
-        'chunks': []
-    }
-    
-    for chunk in chunks:
-        # Create filename
-        priority_label = ['P0', 'P1', 'P2', 'P3', 'P4'][min(chunk.get('priority', 2), 4)]
-        chunk_name = f"{base_name}_chunk{chunk['index']:02d}_{priority_label}.txt"
-        chunk_path = output_path / chunk_name
-        
-        # Write chunk content
-        header = f"=== CHUNK {chunk['index'] + 1}/{chunk['total']} ===\n"
-        header += f"Sections: {', '.join(chunk['sections'])}\n"
-        header += f"Estimated tokens: {chunk['tokens']}\n"
-        header += f"Priority: {priority_label}\n"
-        header += "=" * 40 + "\n\n"
-        
-        with open(chunk_path, 'w', encoding='utf-8') as f:
-            f.write(header + chunk['text'])
-        
-        saved_files.append(str(chunk_path))
-        
-        # Add to manifest
-        manifest['chunks'].append({
-            'file': chunk_name,
-            'index': chunk['index'],
-            'priority': priority_label,
-            'sections': chunk['sections'],
-            'tokens': chunk['tokens']
-        })
-    
-    # Save manifest
-    manifest_path = output_path / f"{base_name}_manifest.json"
-    with open(manifest_path, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, indent=2)
-    saved_files.append(str(manifest_path))
-    
-    return saved_files
-
-
-def main():
-    parser = argparse.ArgumentParser(
-        description='Split PDF papers into manageable chunks for LLM processing'
-    )
-    parser.add_argument('pdf_path', help='Path to the PDF file')
-    parser.add_argument('output_dir', nargs='?', default='./chunks',
-                        help='Output directory for chunks (default: ./chunks)')
-    parser.add_argument('--max-tokens', type=int, default=3500,
-                        help='Maximum tokens per chunk (default: 3500)')
-    
-    args = parser.parse_args()
-    
-    if not HAS_PYMUPDF:
-        print("Error: PyMuPDF is required. Install with: pip install PyMuPDF")
-        sys.exit(1)
-    
-    if not os.path.exists(args.pdf_path):
-        print(f"Error: PDF not found: {args.pdf_path}")
-        sys.exit(1)
-    
-    print(f"Extracting text from: {args.pdf_path}")
-    text = extract_text_from_pdf(args.pdf_path)
-    print(f"Extracted {len(text)} characters (~{estimate_tokens(text)} tokens)")
-    
-    print("Identifying sections...")
-    sections = identify_sections(text)
-    print(f"Found {len(sections)} sections")
-    
-    print(f"Splitting into chunks (max {args.max_tokens} tokens)...")
-    chunks = split_into_chunks(text, sections, args.max_tokens)
-    print(f"Created {len(chunks)} chunks")
-    
-    base_name = Path(args.pdf_path).stem
-    saved_files = save_chunks(chunks, args.output_dir, base_name)
-    
-    print(f"\nSaved {len(saved_files)} files to: {args.output_dir}")
-    print("\nChunk summary:")
-    for chunk in chunks:
-        priority = ['P0-Must', 'P1-High', 'P2-Medium', 'P3-Low', 'P4-Skip'][min(chunk.get('priority', 2), 4)]
-        sections_str = ', '.join(chunk['sections'][:2])
-        if len(chunk['sections']) > 2:
-            sections_str += f" (+{len(chunk['sections'])-2} more)"
-        print(f"  Chunk {chunk['index']+1}: {priority:10} | {chunk['tokens']:5} tokens | {sections_str}")
-
-
-if __name__ == "__main__":
-    main()
+#!/usr/bin/env python3
+"""
+Paper PDF Chunker
+
+Extracts text from PDF and splits it into manageable chunks by sections.
+Useful for processing large papers that exceed context window limits.
+
+Usage:
+    python chunk_paper.py <pdf_path> [output_dir] [--max-tokens N]
+
+Examples:
+    python chunk_paper.py paper.pdf
+    python chunk_paper.py paper.pdf ./chunks/
+    python chunk_paper.py paper.pdf ./chunks/ --max-tokens 3000
+
+Requirements:
+    pip install PyMuPDF  # or: pip install pymupdf
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Iterator, Tuple, Optional
+
+try:
+    import fitz  # PyMuPDF
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    import orjson  # Optional C serializer, ~2-5x faster than stdlib json
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import re2  # Optional: Google RE2, linear-time scan with no backtracking
+    HAS_RE2 = True
+except ImportError:
+    HAS_RE2 = False
+
+
+def dump_json_bytes(obj) -> bytes:
+    """Serialize to indented JSON bytes, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+# Plain-text extraction flags: TEXTFLAGS_TEXT skips image/graphics
+# handling the chunker never uses, and DEHYPHENATE rejoins words broken
+# across line ends. Older PyMuPDF versions without the constants fall
+# back to default get_text() behavior.
+if HAS_PYMUPDF and hasattr(fitz, 'TEXTFLAGS_TEXT'):
+    _TEXT_FLAGS = fitz.TEXTFLAGS_TEXT | getattr(fitz, 'TEXT_DEHYPHENATE', 0)
+else:
+    _TEXT_FLAGS = None
+
+
+def _get_page_text(page) -> str:
+    if _TEXT_FLAGS is not None:
+        return page.get_text("text", flags=_TEXT_FLAGS)
+    return page.get_text()
+
+
+# Common section headers in research papers, grouped by reading priority
+# (0 = must read ... 4 = skip). Each entry becomes a named group in the
+# combined regex, so a match carries its priority directly
+SECTION_PATTERNS = {
+    0: r'Abstract|Conclusion(?:s)?|Summary|Future\s+Work',
+    1: r'Method(?:ology)?|Approach|(?:Proposed\s+)?(?:Method|Framework|Model)'
+       r'|Experiment(?:s|al)?(?:\s+(?:Setup|Results))?|Results|Evaluation',
+    2: r'Introduction|Related\s+Work|Background|Discussion|Analysis|Ablation(?:\s+Stud(?:y|ies))?',
+    3: r'Appendix|Supplementary',
+    4: r'References|Acknowledg(?:e)?ments?',
+}
+
+# One combined multiline regex so the whole text is scanned in a single
+# pass of the C regex engine instead of per-line Python matching; the
+# winning named group (p0..p4) identifies the priority
+_SECTION_PATTERN = (
+    r'^[ \t]*(?:#{1,3}\s*)?(?:\d+\.?\s+)?(?:'
+    + '|'.join(f'(?P<p{priority}>{pattern})' for priority, pattern in sorted(SECTION_PATTERNS.items()))
+    + r')'
+)
+_PRIORITY_GROUPS = tuple(f'p{priority}' for priority in sorted(SECTION_PATTERNS))
+
+# Prefer RE2 when installed: guaranteed linear-time scanning over
+# multi-megabyte extracted texts. Any compile failure (the module wraps
+# a different engine, so feature support can differ) falls back to re
+_SECTION_RE = None
+if HAS_RE2:
+    try:
+        _SECTION_RE = re2.compile(_SECTION_PATTERN, re2.IGNORECASE | re2.MULTILINE)
+    except Exception:
+        _SECTION_RE = None
+if _SECTION_RE is None:
+    _SECTION_RE = re.compile(_SECTION_PATTERN, re.IGNORECASE | re.MULTILINE)
+
+
+def _match_priority(match) -> int:
+    """Priority encoded by whichever named group matched."""
+    group = match.lastgroup
+    if group is None:
+        # Some engines don't track lastgroup; probe the groups directly
+        for name in _PRIORITY_GROUPS:
+            if match.group(name):
+                return int(name[1])
+        return 2
+    return int(group[1])
+
+# Helpers for normalizing matched header lines
+_LEADING_NUM_RE = re.compile(r'^\d+\.?\s*')
+_NONWORD_RE = re.compile(r'[^\w\s]')
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_header(line: str) -> str:
+    """Normalize a header line for priority lookup (papers repeat headers,
+    so memoizing avoids re-running both substitutions)."""
+    normalized = _LEADING_NUM_RE.sub('', line.lower())
+    return _NONWORD_RE.sub('', normalized).strip()
+
+# Priority display labels, built once instead of per chunk
+_PRIORITY_LABELS = ('P0', 'P1', 'P2', 'P3', 'P4')
+_PRIORITY_LONG = ('P0-Must', 'P1-High', 'P2-Medium', 'P3-Low', 'P4-Skip')
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimation (1 token ≈ 4 chars for English)."""
+    return len(text) // 4
+
+
+def iter_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page_num, page_text) one page at a time.
+
+    Streaming form of extract_text_from_pdf for callers that process
+    pages incrementally and don't need the whole paper in memory.
+    """
+    if not HAS_PYMUPDF:
+        raise ImportError(
+            "PyMuPDF is required for PDF processing.\n"
+            "Install with: pip install PyMuPDF"
+        )
+
+    doc = fitz.open(pdf_path)
+    try:
+        for page_num, page in enumerate(doc):
+            yield page_num + 1, _get_page_text(page)
+    finally:
+        doc.close()
+
+
+# Thread-pool extraction only pays off once there are enough pages to
+# amortize opening one document handle per worker
+_MIN_PAGES_PARALLEL = 8
+
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    """Extract text from PDF using PyMuPDF, processing pages in parallel.
+
+    page.get_text() is a C call into MuPDF that releases the GIL, so a
+    thread pool overlaps page parsing across cores. fitz.Document is not
+    thread-safe, so each worker thread opens its own handle.
+    """
+    if not HAS_PYMUPDF:
+        raise ImportError(
+            "PyMuPDF is required for PDF processing.\n"
+            "Install with: pip install PyMuPDF"
+        )
+
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    if page_count < _MIN_PAGES_PARALLEL:
+        return "\n\n".join(
+            f"[PAGE {page_num}]\n{text}" for page_num, text in iter_pages(pdf_path)
+        )
+
+    local = threading.local()
+    opened = []
+
+    def _page(i: int) -> str:
+        doc = getattr(local, 'doc', None)
+        if doc is None:
+            doc = local.doc = fitz.open(pdf_path)
+            opened.append(doc)
+        return f"[PAGE {i + 1}]\n{_get_page_text(doc.load_page(i))}"
+
+    workers = min(8, os.cpu_count() or 1)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            text_parts = list(executor.map(_page, range(page_count)))
+    finally:
+        for doc in opened:
+            doc.close()
+
+    return "\n\n".join(text_parts)
+
+
+def identify_sections(text: str) -> List[Tuple[int, str, str, int]]:
+    """
+    Identify section boundaries in the text.
+
+    Returns:
+        List of (start_pos, section_name, normalized_name, priority)
+    """
+    sections: List[Tuple[int, str, str, int]] = []
+
+    for match in _SECTION_RE.finditer(text):
+        line_start = match.start()
+
+        # Find end of line
+        line_end = text.find('\n', line_start)
+        if line_end == -1:
+            line_end = len(text)
+
+        # Filter on the raw span before allocating the slice: real
+        # headers are short, so anything longer is body text the pattern
+        # happened to match and there is no point copying it out
+        if line_end == line_start or line_end - line_start > 100:
+            continue
+
+        line = text[line_start:line_end].strip()
+        if not line:
+            continue
+
+        sections.append((line_start, line, _normalize_header(line), _match_priority(match)))
+
+    return sections
+
+
+def split_into_chunks(
+    text: str,
+    sections: List[Tuple[int, str, str, int]],
+    max_tokens: int = 3500
+) -> List[Dict]:
+    """
+    Split text into chunks based on sections and token limits.
+    
+    Returns:
+        List of chunk dictionaries with metadata
+    """
+    chunks: List[Dict] = []
+
+    if not sections:
+        # No sections found, split by token count
+        chunks = split_by_tokens(text, max_tokens)
+        _attach_chunk_metadata(chunks)
+        return chunks
+
+    # Add end position for each section
+    section_ranges: List[Dict] = []
+    for i, (start, name, normalized, priority) in enumerate(sections):
+        end = sections[i + 1][0] if i + 1 < len(sections) else len(text)
+        section_ranges.append({
+            'start': start,
+            'end': end,
+            'name': name,
+            'normalized': normalized,
+            'priority': priority
+        })
+    
+    # Group sections into chunks respecting token limits. Section texts
+    # are collected in a parts list and joined once per chunk, avoiding
+    # quadratic string concatenation
+    def new_chunk() -> Dict:
+        return {'sections': [], 'parts': [], 'priority': 999, 'tokens': 0}
+
+    def finalize(chunk: Dict) -> Dict:
+        return {
+            'sections': chunk['sections'],
+            'text': '\n\n'.join(chunk['parts']),
+            'priority': chunk['priority'],
+            'tokens': chunk['tokens']
+        }
+
+    current_chunk = new_chunk()
+
+    for section in section_ranges:
+        section_text = text[section['start']:section['end']]
+        section_tokens = estimate_tokens(section_text)
+
+        # If single section exceeds limit, split it
+        if section_tokens > max_tokens:
+            # Save current chunk if not empty
+            if current_chunk['parts']:
+                chunks.append(finalize(current_chunk))
+                current_chunk = new_chunk()
+
+            # Split large section into sub-chunks
+            sub_chunks = split_by_tokens(section_text, max_tokens, section['name'])
+            for sc in sub_chunks:
+                sc['priority'] = section['priority']
+                sc['sections'] = [section['name']]
+            chunks.extend(sub_chunks)
+            continue
+
+        # Check if adding this section exceeds limit
+        if current_chunk['tokens'] + section_tokens > max_tokens and current_chunk['parts']:
+            chunks.append(finalize(current_chunk))
+            current_chunk = new_chunk()
+
+        # Add section to current chunk
+        current_chunk['sections'].append(section['name'])
+        current_chunk['parts'].append(section_text)
+        current_chunk['priority'] = min(current_chunk['priority'], section['priority'])
+        current_chunk['tokens'] += section_tokens
+
+    # Don't forget the last chunk
+    if current_chunk['parts']:
+        chunks.append(finalize(current_chunk))
+    
+    # Sort by priority
+    chunks.sort(key=lambda x: x['priority'])
+
+    _attach_chunk_metadata(chunks)
+
+    return chunks
+
+
+def _attach_chunk_metadata(chunks: List[Dict]) -> None:
+    """Set index/total and resolve each chunk's priority label once."""
+    for i, chunk in enumerate(chunks):
+        chunk['index'] = i
+        chunk['total'] = len(chunks)
+        chunk['priority_label'] = _PRIORITY_LABELS[min(chunk.get('priority', 2), 4)]
+
+
+def split_by_tokens(
+    text: str,
+    max_tokens: int,
+    section_name: str = "content"
+) -> List[Dict]:
+    """Split text into chunks by token count, respecting paragraph boundaries."""
+    chunks: List[Dict] = []
+    paragraphs = text.split('\n\n')
+
+    if HAS_NUMPY and len(paragraphs) >= _MIN_PARAS_VECTORIZED:
+        return _split_by_tokens_np(paragraphs, max_tokens, section_name)
+
+    current_parts: List[str] = []
+    current_tokens = 0
+
+    def flush() -> None:
+        chunks.append({
+            'sections': [section_name],
+            'text': '\n\n'.join(current_parts).strip(),
+            'tokens': current_tokens
+        })
+
+    for para in paragraphs:
+        para_tokens = estimate_tokens(para)
+
+        if current_tokens + para_tokens > max_tokens and current_parts:
+            flush()
+            current_parts = []
+            current_tokens = 0
+
+        current_parts.append(para)
+        current_tokens += para_tokens
+
+    if current_parts and '\n\n'.join(current_parts).strip():
+        flush()
+
+    return chunks
+
+
+# Below this many paragraphs the numpy prefix-sum path is not worth its
+# array-construction overhead
+_MIN_PARAS_VECTORIZED = 256
+
+
+def _split_by_tokens_np(
+    paragraphs: List[str],
+    max_tokens: int,
+    section_name: str
+) -> List[Dict]:
+    """Vectorized variant of split_by_tokens for paragraph-heavy text.
+
+    Chunk boundaries come from searchsorted over a token prefix sum, so
+    the Python-level accumulator loop disappears; used for inputs like
+    long reference lists with thousands of paragraphs.
+    """
+    lens = np.fromiter((len(p) for p in paragraphs), dtype=np.int64, count=len(paragraphs))
+    cum = np.concatenate(([0], np.cumsum(lens >> 2)))
+
+    chunks: List[Dict] = []
+    start = 0
+    total = len(paragraphs)
+    while start < total:
+        # Furthest boundary whose token sum stays within budget; a single
+        # oversized paragraph still gets its own chunk
+        end = int(np.searchsorted(cum, cum[start] + max_tokens, side='right')) - 1
+        if end <= start:
+            end = start + 1
+
+        chunk_text = '\n\n'.join(paragraphs[start:end]).strip()
+        if chunk_text:
+            chunks.append({
+                'sections': [section_name],
+                'text': chunk_text,
+                'tokens': int(cum[end] - cum[start])
+            })
+        start = end
+
+    return chunks
+
+
+# Extracted text and detected sections are cached on disk, so re-running
+# with different --max-tokens skips the expensive PDF parse entirely.
+# Keyed by path+mtime+size, so an edited or replaced PDF misses cleanly.
+_CACHE_DIR = Path.home() / '.cache' / 'paper-reader'
+_SECTIONS_CACHE_VERSION = 2  # v2: section tuples carry the priority
+
+
+def _cache_key(pdf_path: str) -> str:
+    stat = os.stat(pdf_path)
+    fingerprint = f"{os.path.abspath(pdf_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return hashlib.blake2b(fingerprint.encode()).hexdigest()[:16]
+
+
+def _load_extraction_cache(pdf_path: str) -> Optional[Tuple[str, List[Tuple[int, str, str, int]]]]:
+    """Return cached (text, sections) for this PDF, or None on a miss."""
+    key = _cache_key(pdf_path)
+    text_path = _CACHE_DIR / f"{key}.txt"
+    sections_path = _CACHE_DIR / f"{key}.sections.json"
+
+    try:
+        text = text_path.read_text(encoding='utf-8')
+        payload = json.loads(sections_path.read_text(encoding='utf-8'))
+        if payload.get('version') != _SECTIONS_CACHE_VERSION:
+            return None
+        sections = [tuple(entry) for entry in payload['sections']]
+    except Exception:
+        # Missing, corrupt or incompatible cache entries (whatever the
+        # shape of the damage) just mean a normal re-extraction
+        return None
+
+    return text, sections
+
+
+def _save_extraction_cache(
+    pdf_path: str,
+    text: str,
+    sections: List[Tuple[int, str, str, int]]
+) -> None:
+    """Best-effort cache write; failures never break chunking."""
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        key = _cache_key(pdf_path)
+        (_CACHE_DIR / f"{key}.txt").write_text(text, encoding='utf-8')
+        payload = {'version': _SECTIONS_CACHE_VERSION, 'sections': [list(s) for s in sections]}
+        (_CACHE_DIR / f"{key}.sections.json").write_text(json.dumps(payload), encoding='utf-8')
+    except OSError:
+        pass
+
+
+# Chunk file header template, assembled once so each chunk costs a
+# single %-formatting operation
+_HEADER_FMT = (
+    "=== CHUNK %d/%d ===\n"
+    "Sections: %s\n"
+    "Estimated tokens: %d\n"
+    "Priority: %s\n"
+    + "=" * 40 + "\n\n"
+)
+
+
+def _write_one_chunk(chunk: Dict, output_path: Path, base_name: str) -> Tuple[str, Dict]:
+    """Write a single chunk file; returns (saved path, manifest entry)."""
+    priority_label = chunk['priority_label']
+    chunk_name = f"{base_name}_chunk{chunk['index']:02d}_{priority_label}.txt"
+    chunk_path = output_path / chunk_name
+
+    # Build the whole file as one bytes blob and write it in a single
+    # syscall, skipping the text-mode encoding layer
+    header = _HEADER_FMT % (
+        chunk['index'] + 1,
+        chunk['total'],
+        ', '.join(chunk['sections']),
+        chunk['tokens'],
+        priority_label
+    )
+    chunk_path.write_bytes((header + chunk['text']).encode('utf-8'))
+
+    return str(chunk_path), {
+        'file': chunk_name,
+        'index': chunk['index'],
+        'priority': priority_label,
+        'sections': chunk['sections'],
+        'tokens': chunk['tokens']
+    }
+
+
+def save_chunks(
+    chunks: List[Dict],
+    output_dir: str,
+    base_name: str
+) -> List[str]:
+    """Save chunks to individual files, writing them in parallel."""
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    saved_files: List[str] = []
+
+    manifest = {
+        'source': base_name,
+        'total_chunks': len(chunks),
+        'chunks': []
+    }
+
+    # Chunk writes are independent, so a thread pool overlaps the disk
+    # waits; executor.map preserves chunk order in the manifest
+    if chunks:
+        with ThreadPoolExecutor(max_workers=min(16, len(chunks))) as executor:
+            results = executor.map(
+                lambda chunk: _write_one_chunk(chunk, output_path, base_name),
+                chunks
+            )
+            for saved_path, entry in results:
+                saved_files.append(saved_path)
+                manifest['chunks'].append(entry)
+
+    # Save manifest
+    manifest_path = output_path / f"{base_name}_manifest.json"
+    manifest_path.write_bytes(dump_json_bytes(manifest))
+    saved_files.append(str(manifest_path))
+
+    return saved_files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Split PDF papers into manageable chunks for LLM processing'
+    )
+    parser.add_argument('pdf_path', help='Path to the PDF file')
+    parser.add_argument('output_dir', nargs='?', default='./chunks',
+                        help='Output directory for chunks (default: ./chunks)')
+    parser.add_argument('--max-tokens', type=int, default=3500,
+                        help='Maximum tokens per chunk (default: 3500)')
+    
+    args = parser.parse_args()
+    
+    if not HAS_PYMUPDF:
+        print("Error: PyMuPDF is required. Install with: pip install PyMuPDF")
+        sys.exit(1)
+    
+    if not os.path.exists(args.pdf_path):
+        print(f"Error: PDF not found: {args.pdf_path}")
+        sys.exit(1)
+    
+    cached = _load_extraction_cache(args.pdf_path)
+    if cached is not None:
+        text, sections = cached
+        print(f"Loaded cached extraction for: {args.pdf_path}")
+        print(f"{len(text)} characters (~{estimate_tokens(text)} tokens), {len(sections)} sections")
+    else:
+        print(f"Extracting text from: {args.pdf_path}")
+        text = extract_text_from_pdf(args.pdf_path)
+        print(f"Extracted {len(text)} characters (~{estimate_tokens(text)} tokens)")
+
+        print("Identifying sections...")
+        sections = identify_sections(text)
+        print(f"Found {len(sections)} sections")
+
+        _save_extraction_cache(args.pdf_path, text, sections)
+    
+    print(f"Splitting into chunks (max {args.max_tokens} tokens)...")
+    chunks = split_into_chunks(text, sections, args.max_tokens)
+    print(f"Created {len(chunks)} chunks")
+    
+    base_name = Path(args.pdf_path).stem
+    saved_files = save_chunks(chunks, args.output_dir, base_name)
+    
+    print(f"\nSaved {len(saved_files)} files to: {args.output_dir}")
+    print("\nChunk summary:")
+    for chunk in chunks:
+        priority = _PRIORITY_LONG[min(chunk.get('priority', 2), 4)]
+        sections_str = ', '.join(chunk['sections'][:2])
+        if len(chunk['sections']) > 2:
+            sections_str += f" (+{len(chunk['sections'])-2} more)"
+        print(f"  Chunk {chunk['index']+1}: {priority:10} | {chunk['tokens']:5} tokens | {sections_str}")
+
+
+if __name__ == "__main__":
+    main()
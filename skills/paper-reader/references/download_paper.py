@@ -7,45 +7,79 @@ Supports automatic URL normalization for common paper repositories.
 
 Usage:
     python download_paper.py <url> [output_path]
-    
+    python download_paper.py <url> <url> ... [output_dir]
+
 Examples:
     python download_paper.py https://arxiv.org/abs/2505.22596
     python download_paper.py https://arxiv.org/pdf/2505.22596 ./papers/
     python download_paper.py https://openreview.net/pdf?id=xxx paper.pdf
 """
 
+import asyncio
 import os
 import re
 import sys
 import time
 import urllib.request
 import urllib.error
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+
+try:
+    import requests
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+
+# Request headers (some sites block the default urllib user-agent).
+# No Accept-Encoding here: urllib does not decompress responses, so the
+# fallback path must receive the PDF bytes as-is
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+}
+
+# Shared keep-alive session so batch downloads to the same host (arxiv)
+# reuse one TCP+TLS connection instead of handshaking per paper
+_SESSION = None
+
+
+def _get_session():
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = requests.Session()
+        _SESSION.headers.update(_HEADERS)
+        # Safe here: requests decompresses gzip bodies transparently
+        _SESSION.headers['Accept-Encoding'] = 'gzip'
+    return _SESSION
+
+
+# Compiled once at import; these run on every download call
+_ARXIV_RE = re.compile(r'arxiv\.org/(?:abs|pdf)/(\d+\.\d+)(?:\.pdf)?')
+_OPENREVIEW_RE = re.compile(r'openreview\.net/pdf\?id=(\w+)')
 
 
 def normalize_arxiv_url(url: str) -> str:
     """
     Convert arxiv URLs to direct PDF download links.
-    
+
     Handles:
         - https://arxiv.org/abs/2505.22596 -> https://arxiv.org/pdf/2505.22596.pdf
         - https://arxiv.org/pdf/2505.22596 -> https://arxiv.org/pdf/2505.22596.pdf
         - https://arxiv.org/pdf/2505.22596.pdf -> unchanged
     """
-    # Extract arxiv ID from various URL formats
-    patterns = [
-        r'arxiv\.org/abs/(\d+\.\d+)',      # abs page
-        r'arxiv\.org/pdf/(\d+\.\d+)',      # pdf without extension
-        r'arxiv\.org/pdf/(\d+\.\d+)\.pdf', # pdf with extension
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            arxiv_id = match.group(1)
-            return f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-    
+    match = _ARXIV_RE.search(url)
+    if match:
+        return f"https://arxiv.org/pdf/{match.group(1)}.pdf"
+
     return url
 
 
@@ -72,12 +106,12 @@ def extract_filename_from_url(url: str) -> str:
     """Extract a reasonable filename from the URL."""
     
     # For arxiv, use the paper ID
-    arxiv_match = re.search(r'arxiv\.org/pdf/(\d+\.\d+)', url)
+    arxiv_match = _ARXIV_RE.search(url)
     if arxiv_match:
         return f"arxiv_{arxiv_match.group(1)}.pdf"
-    
+
     # For OpenReview, use the paper ID
-    openreview_match = re.search(r'openreview\.net/pdf\?id=(\w+)', url)
+    openreview_match = _OPENREVIEW_RE.search(url)
     if openreview_match:
         return f"openreview_{openreview_match.group(1)}.pdf"
     
@@ -89,6 +123,66 @@ def extract_filename_from_url(url: str) -> str:
     return path or "paper.pdf"
 
 
+def _preflight_content_type(pdf_url: str, timeout: int) -> Optional[str]:
+    """
+    Issue a HEAD request and return an error message if the URL clearly
+    serves HTML instead of a PDF, or None to proceed with the GET.
+
+    Skipped for arxiv.org (known to serve PDFs), and any HEAD failure --
+    some servers reject the method outright -- just defers to the GET,
+    which still validates the %PDF signature.
+    """
+    if 'arxiv.org' in pdf_url:
+        return None
+
+    try:
+        if HAS_REQUESTS:
+            response = _get_session().head(pdf_url, timeout=timeout, allow_redirects=True)
+            if response.status_code >= 400:
+                return None
+            content_type = response.headers.get('Content-Type', '')
+        else:
+            request = urllib.request.Request(pdf_url, headers=_HEADERS, method='HEAD')
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                content_type = response.headers.get('Content-Type', '')
+    except Exception:
+        return None
+
+    if content_type.startswith('text/html'):
+        return f"URL does not point to a PDF file (Content-Type: {content_type})"
+    return None
+
+
+def _fetch_requests(pdf_url: str, output_file: Path, timeout: int) -> Tuple[bool, str]:
+    """Download one PDF through the shared keep-alive session."""
+    with _get_session().get(pdf_url, timeout=timeout, stream=True) as response:
+        if response.status_code == 404:
+            return False, f"Paper not found (404): {pdf_url}"
+        if response.status_code == 403:
+            return False, f"Access denied (403): {pdf_url}"
+        response.raise_for_status()
+
+        content_type = response.headers.get('Content-Type', '')
+
+        # Verify the PDF signature from the first chunk, before anything
+        # touches disk
+        body = response.iter_content(65536)
+        first = next(body, b'')
+        if not first.startswith(b'%PDF'):
+            if 'application/pdf' not in content_type and 'octet-stream' not in content_type:
+                return False, f"URL does not point to a PDF file (Content-Type: {content_type})"
+            return False, "Downloaded content is not a valid PDF file"
+
+        total = len(first)
+        with open(output_file, 'wb') as f:
+            f.write(first)
+            for chunk in body:
+                f.write(chunk)
+                total += len(chunk)
+
+    return True, f"Successfully downloaded to: {output_file} ({total / 1024:.1f} KB)"
+
+
 def download_pdf(
     url: str,
     output_path: Optional[str] = None,
@@ -122,41 +216,45 @@ def download_pdf(
     
     # Ensure parent directory exists
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Set up request headers (some sites block default urllib user-agent)
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
-                      '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
+
+    # Cheap HEAD preflight: reject obvious HTML pages before downloading
+    # any body bytes
+    error = _preflight_content_type(pdf_url, timeout)
+    if error:
+        return False, error
+
     last_error = None
-    
+
     for attempt in range(1, max_retries + 1):
         try:
             print(f"[Attempt {attempt}/{max_retries}] Downloading: {pdf_url}")
-            
-            request = urllib.request.Request(pdf_url, headers=headers)
+
+            if HAS_REQUESTS:
+                return _fetch_requests(pdf_url, output_file, timeout)
+
+            request = urllib.request.Request(pdf_url, headers=_HEADERS)
             
             with urllib.request.urlopen(request, timeout=timeout) as response:
-                # Check content type
                 content_type = response.headers.get('Content-Type', '')
-                if 'application/pdf' not in content_type and 'octet-stream' not in content_type:
-                    # Some servers don't set correct content-type, check first bytes
-                    content = response.read()
-                    if not content.startswith(b'%PDF'):
+
+                # Verify the PDF signature from the first bytes, before
+                # anything touches disk
+                first = response.read(8)
+                if not first.startswith(b'%PDF'):
+                    if 'application/pdf' not in content_type and 'octet-stream' not in content_type:
                         return False, f"URL does not point to a PDF file (Content-Type: {content_type})"
-                else:
-                    content = response.read()
-                
-                # Verify PDF signature
-                if not content.startswith(b'%PDF'):
                     return False, "Downloaded content is not a valid PDF file"
-                
-                # Save to file
+
+                # Stream to disk in 64 KB chunks instead of buffering the
+                # whole body in memory
+                total = len(first)
                 with open(output_file, 'wb') as f:
-                    f.write(content)
-                
-                file_size = len(content) / 1024  # KB
+                    f.write(first)
+                    while chunk := response.read(65536):
+                        f.write(chunk)
+                        total += len(chunk)
+
+                file_size = total / 1024  # KB
                 return True, f"Successfully downloaded to: {output_file} ({file_size:.1f} KB)"
         
         except urllib.error.HTTPError as e:
@@ -183,20 +281,93 @@ def download_pdf(
     return False, f"Failed after {max_retries} attempts. Last error: {last_error}"
 
 
+async def _download_one_async(session, semaphore, url: str, output_dir: Path) -> Tuple[str, bool, str]:
+    """Fetch one paper through the shared aiohttp session."""
+    pdf_url = normalize_url(url)
+    output_file = output_dir / extract_filename_from_url(pdf_url)
+
+    async with semaphore:
+        try:
+            async with session.get(pdf_url) as response:
+                if response.status != 200:
+                    return url, False, f"HTTP Error {response.status}: {pdf_url}"
+
+                body = response.content.iter_chunked(65536)
+                first = await anext(body, b'')
+                if not first.startswith(b'%PDF'):
+                    return url, False, "Downloaded content is not a valid PDF file"
+
+                total = len(first)
+                with open(output_file, 'wb') as f:
+                    f.write(first)
+                    async for chunk in body:
+                        f.write(chunk)
+                        total += len(chunk)
+
+                return url, True, f"Successfully downloaded to: {output_file} ({total / 1024:.1f} KB)"
+        except Exception as e:
+            return url, False, f"Unexpected error: {e}"
+
+
+async def _download_many_async(urls: List[str], output_dir: Path, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(headers=_HEADERS, timeout=timeout) as session:
+        tasks = [_download_one_async(session, semaphore, url, output_dir) for url in urls]
+        return await asyncio.gather(*tasks)
+
+
+def download_many(
+    urls: List[str],
+    output_dir: str = ".",
+    concurrency: int = 8
+) -> List[Tuple[str, bool, str]]:
+    """
+    Download several papers concurrently.
+
+    Uses aiohttp with a semaphore capping in-flight requests when it is
+    installed; otherwise falls back to a thread pool over download_pdf,
+    so batch downloads overlap network waits either way.
+
+    Returns:
+        List of (url, success, message), one entry per input URL.
+    """
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if HAS_AIOHTTP:
+        return asyncio.run(_download_many_async(urls, out_dir, concurrency))
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        messages = pool.map(lambda u: download_pdf(u, str(out_dir)), urls)
+        for url, (success, message) in zip(urls, messages):
+            results.append((url, success, message))
+    return results
+
+
 def main():
     """CLI entry point."""
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    urls = [a for a in args if '://' in a]
+    paths = [a for a in args if '://' not in a]
+
+    if not urls:
         print(__doc__)
         print("\nError: Please provide a URL")
         sys.exit(1)
-    
-    url = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    success, message = download_pdf(url, output_path)
-    print(message)
-    
-    sys.exit(0 if success else 1)
+
+    output_path = paths[0] if paths else None
+
+    if len(urls) == 1:
+        success, message = download_pdf(urls[0], output_path)
+        print(message)
+        sys.exit(0 if success else 1)
+
+    results = download_many(urls, output_path or ".")
+    for _, _, message in results:
+        print(message)
+    sys.exit(0 if all(success for _, success, _ in results) else 1)
 
 
 if __name__ == "__main__":